@@ -1,24 +1,51 @@
 #!/usr/bin/env python3
 
+import asyncio
+import importlib.util
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import time
+import random
 import os
 import json
-import pandas as pd
-from typing import Dict, List, Union, Optional
+import csv
+import tempfile
+import threading
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import warnings
 
-# Suppress pandas warnings for cleaner output
-warnings.filterwarnings('ignore')
+# Prefer orjson's C encoder for summary export, fall back to the stdlib
+try:
+    import orjson
+    
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
 
 class WhatsAppAvatarChecker:
+    # Result columns consumed by analyze_avatar_results
+    RESULT_COLUMNS = ('whatsapp', 'avatar', 'gender', 'age', 'hair_color', 'skin_color', 'category')
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.base_url = 'https://api.checknumber.ai/wa/api/avatar/tasks'
         self.session = requests.Session()
         self.session.headers.update({'X-API-Key': self.api_key})
-        self.session.timeout = 30
+        self.timeout = 30
+        self._report_lock = threading.Lock()
+        
+        # Keep-alive pool shared by uploads, polling and downloads; retry transient errors
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
     
     def upload_file(self, file_path: str) -> Dict:
         """Upload file for avatar analysis"""
@@ -26,9 +53,11 @@ class WhatsAppAvatarChecker:
             raise FileNotFoundError(f"File not found: {file_path}")
         
         try:
+            # Stream the multipart body from disk instead of building it in memory
             with open(file_path, 'rb') as file:
-                files = {'file': (os.path.basename(file_path), file, 'text/plain')}
-                response = self.session.post(self.base_url, files=files)
+                encoder = MultipartEncoder(fields={'file': (os.path.basename(file_path), file, 'text/plain')})
+                response = self.session.post(self.base_url, data=encoder, timeout=self.timeout,
+                                             headers={'Content-Type': encoder.content_type})
             
             response.raise_for_status()
             return response.json()
@@ -38,53 +67,103 @@ class WhatsAppAvatarChecker:
         except json.JSONDecodeError as e:
             raise Exception(f"JSON decode error: {e}")
     
-    def check_task_status(self, task_id: str, user_id: str) -> Dict:
-        """Check avatar analysis task status"""
+    def check_task_status(self, task_id: str, user_id: str, wait_seconds: int = 0) -> Dict:
+        """Check avatar analysis task status
+        
+        With ``wait_seconds`` > 0 the server is asked to hold the request open
+        until the task changes or the wait elapses (long-polling).
+        """
+        return self._get_task_status(task_id, user_id, wait_seconds)[0]
+    
+    def _get_task_status(self, task_id: str, user_id: str, wait_seconds: int = 0) -> Tuple[Dict, bool]:
+        """Check task status, also reporting whether the server honoured long-polling
+        
+        Long-polling only counts when the server advertises it *and* actually held
+        the request for most of ``wait_seconds``; an immediate answer does not.
+        """
         url = f"{self.base_url}/{task_id}?user_id={user_id}"
+        headers = {}
+        timeout = self.timeout
+        if wait_seconds > 0:
+            headers['Prefer'] = f'wait={wait_seconds}'
+            timeout = wait_seconds + 5
         
         try:
-            response = self.session.get(url)
+            response = self.session.get(url, headers=headers, timeout=timeout)
             response.raise_for_status()
-            return response.json()
+            long_polled = (wait_seconds > 0
+                           and response.headers.get('X-Long-Poll', '').lower() == 'supported'
+                           and response.elapsed.total_seconds() >= wait_seconds * 0.8)
+            return response.json(), long_polled
         
         except requests.exceptions.RequestException as e:
             raise Exception(f"Request failed: {e}")
         except json.JSONDecodeError as e:
             raise Exception(f"JSON decode error: {e}")
     
-    def poll_task_status(self, task_id: str, user_id: str, interval: int = 5) -> Dict:
-        """Poll avatar analysis task status until completion"""
-        print("🤖 Starting AI-powered avatar analysis...")
+    def poll_task_status(self, task_id: str, user_id: str, interval: float = 5.0,
+                         max_interval: float = 30.0, backoff: float = 1.5,
+                         wait_seconds: int = 25) -> Dict:
+        """Poll avatar analysis task status until completion
+        
+        Each check asks the server to long-poll for up to ``wait_seconds``. When
+        the server does not support that, the delay between checks grows by
+        ``backoff`` up to ``max_interval`` while the task makes no progress, and
+        drops back to ``interval`` when it does, so a steadily progressing task is
+        never checked more often than every ``interval`` seconds.
+        """
+        print(f"🤖 Starting AI-powered avatar analysis for task {task_id}...")
+        
+        delay = interval
+        prev_success = -1
+        last_printed = None
         
         while True:
-            response = self.check_task_status(task_id, user_id)
+            response, long_polled = self._get_task_status(task_id, user_id, wait_seconds)
             status = response['status']
             success = response['success']
             total = response['total']
             
-            if status == 'processing':
-                print(f"🔄 AI Processing: {success}/{total} avatars analyzed")
-            else:
-                print(f"📊 Status: {status}, Success: {success}, Total: {total}")
+            # Only report when the status or progress actually changes
+            if (status, success) != last_printed:
+                last_printed = (status, success)
+                if status == 'processing':
+                    print(f"🔄 [{task_id}] AI Processing: {success}/{total} avatars analyzed")
+                else:
+                    print(f"📊 [{task_id}] Status: {status}, Success: {success}, Total: {total}")
             
             if response['status'] == 'exported':
-                print(f"✅ Avatar analysis complete! Results: {response.get('result_url', 'N/A')}")
+                print(f"✅ [{task_id}] Avatar analysis complete! Results: {response.get('result_url', 'N/A')}")
                 return response
             elif response['status'] == 'failed':
-                raise Exception('Avatar analysis task failed')
+                raise Exception(f'Avatar analysis task {task_id} failed')
+            
+            if long_polled:
+                prev_success = success
+                continue  # The server already waited for us
             
-            time.sleep(interval)
+            delay = self._next_poll_delay(delay, success != prev_success, interval, max_interval, backoff)
+            prev_success = success
+            time.sleep(delay * random.uniform(0.8, 1.2))
+    
+    @staticmethod
+    def _next_poll_delay(delay: float, progressed: bool, interval: float,
+                         max_interval: float, backoff: float) -> float:
+        """Back off while idle, reset as soon as progress is observed"""
+        if progressed:
+            return interval
+        return min(max_interval, delay * backoff)
     
     def create_input_file(self, phone_numbers: Union[List[str], str], file_path: str = 'input.txt') -> str:
         """Create input file from phone numbers"""
-        if isinstance(phone_numbers, list):
-            content = '\n'.join(phone_numbers)
-        else:
-            content = phone_numbers
-        
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            if isinstance(phone_numbers, list):
+                # Stream numbers out in 1 MiB flushes instead of joining them in memory
+                with open(file_path, 'w', buffering=1 << 20, encoding='utf-8', newline='') as f:
+                    f.writelines(f"{number}\n" for number in phone_numbers)
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(phone_numbers)
             return file_path
         except IOError as e:
             raise Exception(f"Failed to create file {file_path}: {e}")
@@ -92,125 +171,396 @@ class WhatsAppAvatarChecker:
     def download_results(self, result_url: str, output_path: str = 'avatar_results.xlsx') -> str:
         """Download avatar analysis results"""
         try:
-            response = requests.get(result_url, stream=True, timeout=300)
+            # Reuse the pooled session, but never send the API key to another host
+            headers = None if self._is_api_host(result_url) else {'X-API-Key': None}
+            response = self.session.get(result_url, headers=headers, stream=True, timeout=300)
             response.raise_for_status()
             
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
+            with open(output_path, 'wb', buffering=8 * 1024 * 1024) as f:
+                self._preallocate(f, response.headers)
+                try:
+                    for chunk in response.iter_content(chunk_size=128 * 1024):
                         f.write(chunk)
+                finally:
+                    # Drop preallocated bytes that were not written, so an interrupted
+                    # download stays short rather than being zero-padded to full size
+                    f.truncate()
             
             return output_path
         
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to download results: {e}")
     
-    def analyze_avatar_results(self, results_file: str) -> Dict:
-        """Analyze avatar results and provide demographic insights"""
+    def _is_api_host(self, url: str) -> bool:
+        """Whether ``url`` points at the same host as the API"""
+        return urlparse(url).netloc.lower() == urlparse(self.base_url).netloc.lower()
+    
+    @staticmethod
+    def _preallocate(f, headers) -> None:
+        """Reserve the final file size up front so it is written in contiguous extents"""
+        # With Content-Encoding the decoded body size differs from Content-Length
+        if headers.get('Content-Encoding', 'identity') != 'identity':
+            return
         try:
-            df = pd.read_excel(results_file)
-        except Exception as e:
-            raise Exception(f"Failed to read results file: {e}")
+            size = int(headers.get('Content-Length', 0))
+        except ValueError:
+            return
+        if size <= 0:
+            return
         
-        print("\n🤖 AI AVATAR ANALYSIS SUMMARY")
-        print("=" * 50)
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(f.fileno(), 0, size)
+            else:
+                os.ftruncate(f.fileno(), size)
+        except OSError:
+            pass  # Preallocation is only an optimisation
+    
+    def analyze_many(self, file_paths: List[str], max_workers: int = 16,
+                     output_dir: str = '.') -> Dict[str, Union[Dict, None, Exception]]:
+        """Run several input files through the full pipeline in parallel threads
         
-        # Basic statistics
-        total_records = len(df)
-        whatsapp_accounts = len(df[df.get('whatsapp') == 'yes']) if 'whatsapp' in df.columns else 0
-        available_avatars = len(df[df.get('avatar', 'unknown') != 'unknown']) if 'avatar' in df.columns else 0
+        All threads share the pooled session. Returns a mapping of input file to
+        its analysis (None when the task finished without a result URL, or the
+        exception it failed with).
+        """
+        output_paths = self._results_paths(file_paths, output_dir)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._analyze_one, path, output_paths[path]): path
+                       for path in output_paths}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    results[futures[future]] = e
+        return {path: results[path] for path in output_paths}
+    
+    def _analyze_one(self, file_path: str, output_path: str) -> Optional[Dict]:
+        """Run upload -> poll -> download -> analyze for a single input file"""
+        upload_response = self.upload_file(file_path)
+        final_response = self.poll_task_status(upload_response['task_id'], upload_response['user_id'])
+        if not final_response.get('result_url'):
+            return None
+        
+        results_file = self.download_results(final_response['result_url'], output_path)
+        return self.analyze_avatar_results(results_file)
+    
+    @staticmethod
+    def _results_paths(file_paths: List[str], output_dir: str) -> Dict[str, str]:
+        """Map each input file to its own results path in ``output_dir``
         
-        print(f"📊 Total Records: {total_records:,}")
-        print(f"✅ WhatsApp Accounts: {whatsapp_accounts:,} ({whatsapp_accounts/total_records*100:.1f}%)")
-        print(f"🖼️ Available Avatars: {available_avatars:,} ({available_avatars/total_records*100:.1f}%)")
+        Inputs sharing a name (``a/input.txt``, ``b/input.txt``, ``input.csv``)
+        get numbered suffixes so concurrent downloads never share a file.
+        """
+        paths = {}
+        used = set()
+        for file_path in file_paths:
+            if file_path in paths:
+                continue
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            candidate, n = name, 1
+            while candidate in used:
+                n += 1
+                candidate = f"{name}_{n}"
+            used.add(candidate)
+            paths[file_path] = os.path.join(output_dir, f"{candidate}_avatar_results.xlsx")
+        return paths
+    
+    async def async_analyze(self, file_paths: List[str], output_dir: str = '.',
+                            max_concurrency: int = 32) -> Dict[str, Union[str, None, Exception]]:
+        """Upload, poll and download several input files concurrently
         
-        analysis = {
-            'total_records': total_records,
-            'whatsapp_accounts': whatsapp_accounts,
-            'available_avatars': available_avatars
-        }
+        At most ``max_concurrency`` files are in flight at once, matching the
+        connection pool size so no request waits on a pool slot. Returns a mapping
+        of input file to downloaded results file (None when the task finished
+        without a result URL, or the exception it failed with).
+        Requires httpx; HTTP/2 is used when the h2 package is installed.
+        """
+        # Imported lazily: only the async batch path needs httpx
+        import httpx
         
-        # Gender analysis
-        if 'gender' in df.columns:
-            gender_data = df['gender'].value_counts().to_dict()
-            gender_known = len(df[df['gender'] != 'unknown'])
+        http2 = importlib.util.find_spec('h2') is not None
+        # The API key is sent per request to the API only, never to result hosts
+        async with httpx.AsyncClient(http2=http2, timeout=self.timeout,
+                                     limits=httpx.Limits(max_connections=max_concurrency)) as client:
+            semaphore = asyncio.Semaphore(max_concurrency)
             
-            print(f"\n👥 GENDER ANALYSIS ({gender_known:,} profiles)")
-            print("-" * 30)
-            for gender, count in gender_data.items():
-                if gender != 'unknown':
-                    percentage = count/gender_known*100 if gender_known > 0 else 0
-                    print(f"   {gender.capitalize()}: {count:,} ({percentage:.1f}%)")
+            async def run(path: str, output_path: str) -> Optional[str]:
+                async with semaphore:
+                    return await self._analyze_async(client, path, output_path)
             
-            analysis['gender'] = gender_data
+            # Keep going when one file fails so siblings finish before the client closes
+            output_paths = self._results_paths(file_paths, output_dir)
+            results = await asyncio.gather(*[run(path, output_path)
+                                             for path, output_path in output_paths.items()],
+                                           return_exceptions=True)
+        return dict(zip(output_paths, results))
+    
+    async def _analyze_async(self, client: 'httpx.AsyncClient', file_path: str, output_path: str) -> Optional[str]:
+        """Run upload -> poll -> download for a single input file"""
+        upload_response = await self._upload_async(client, file_path)
+        final_response = await self._poll_async(client, upload_response['task_id'], upload_response['user_id'])
+        if not final_response.get('result_url'):
+            return None
+        
+        return await self._download_async(client, final_response['result_url'], output_path)
+    
+    async def _upload_async(self, client: 'httpx.AsyncClient', file_path: str) -> Dict:
+        """Upload file for avatar analysis"""
+        import httpx
+        
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Age analysis
-        if 'age' in df.columns:
-            age_data = df['age'].value_counts().to_dict()
-            age_known = len(df[df['age'] != 'unknown'])
+        try:
+            with open(file_path, 'rb') as file:
+                files = {'file': (os.path.basename(file_path), file, 'text/plain')}
+                response = await client.post(self.base_url, files=files,
+                                             headers={'X-API-Key': self.api_key})
             
-            print(f"\n🎂 AGE ANALYSIS ({age_known:,} profiles)")
-            print("-" * 25)
-            age_ranges = {}
-            for age_str, count in age_data.items():
-                if age_str != 'unknown':
-                    age_ranges[age_str] = count
+            response.raise_for_status()
+            return response.json()
+        
+        except httpx.HTTPError as e:
+            raise Exception(f"Request failed: {e}")
+        except json.JSONDecodeError as e:
+            raise Exception(f"JSON decode error: {e}")
+    
+    async def _poll_async(self, client: 'httpx.AsyncClient', task_id: str, user_id: str,
+                          interval: float = 5.0, max_interval: float = 30.0, backoff: float = 1.5) -> Dict:
+        """Poll avatar analysis task status until completion"""
+        import httpx
+        
+        url = f"{self.base_url}/{task_id}?user_id={user_id}"
+        delay = interval
+        prev_success = -1
+        
+        while True:
+            try:
+                http_response = await client.get(url, headers={'X-API-Key': self.api_key})
+                http_response.raise_for_status()
+                response = http_response.json()
+            except httpx.HTTPError as e:
+                raise Exception(f"Request failed: {e}")
+            except json.JSONDecodeError as e:
+                raise Exception(f"JSON decode error: {e}")
             
-            # Sort age ranges for better display
-            sorted_ages = sorted(age_ranges.items(), key=lambda x: self._parse_age(x[0]))
-            for age_str, count in sorted_ages[:10]:  # Top 10 age ranges
-                percentage = count/age_known*100 if age_known > 0 else 0
-                print(f"   {age_str}: {count:,} ({percentage:.1f}%)")
+            if response['status'] == 'exported':
+                print(f"✅ Task {task_id} complete! Results: {response.get('result_url', 'N/A')}")
+                return response
+            elif response['status'] == 'failed':
+                raise Exception(f'Avatar analysis task {task_id} failed')
             
-            analysis['age'] = age_data
+            success = response['success']
+            delay = self._next_poll_delay(delay, success != prev_success, interval, max_interval, backoff)
+            prev_success = success
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+    
+    async def _download_async(self, client: 'httpx.AsyncClient', result_url: str, output_path: str) -> str:
+        """Download avatar analysis results"""
+        import httpx
         
-        # Hair color analysis
-        if 'hair_color' in df.columns:
-            hair_data = df['hair_color'].value_counts().to_dict()
-            hair_known = len(df[df['hair_color'] != 'unknown'])
-            
-            print(f"\n💇 HAIR COLOR ANALYSIS ({hair_known:,} profiles)")
-            print("-" * 35)
-            for color, count in list(hair_data.items())[:8]:  # Top 8 colors
-                if color != 'unknown':
-                    percentage = count/hair_known*100 if hair_known > 0 else 0
-                    print(f"   {color.capitalize()}: {count:,} ({percentage:.1f}%)")
+        try:
+            async with client.stream('GET', result_url, timeout=300) as response:
+                response.raise_for_status()
+                with open(output_path, 'wb', buffering=8 * 1024 * 1024) as f:
+                    self._preallocate(f, response.headers)
+                    try:
+                        async for chunk in response.aiter_bytes(chunk_size=128 * 1024):
+                            f.write(chunk)
+                    finally:
+                        f.truncate()  # Keep interrupted downloads short, see download_results
             
-            analysis['hair_color'] = hair_data
+            return output_path
+        
+        except httpx.HTTPError as e:
+            raise Exception(f"Failed to download results: {e}")
+    
+    def analyze_avatar_results(self, results_file: str, use_cache: bool = False) -> Dict:
+        """Analyze avatar results and provide demographic insights
         
-        # Ethnicity analysis
-        if 'skin_color' in df.columns:
-            ethnicity_data = df['skin_color'].value_counts().to_dict()
-            ethnicity_known = len(df[df['skin_color'] != 'unknown'])
+        Pass ``use_cache=True`` when re-analysing the same file: the parsed counts
+        are then stored in (and reused from) ``<results_file>.counts.json``.
+        """
+        try:
+            total_records, counts = self._count_results(results_file, use_cache)
+        except Exception as e:
+            raise Exception(f"Failed to read results file: {e}")
+        
+        # Basic statistics
+        whatsapp_accounts = counts['whatsapp']['yes'] if 'whatsapp' in counts else 0
+        available_avatars = total_records - counts['avatar']['unknown'] if 'avatar' in counts else 0
+        
+        analysis = {
+            'total_records': total_records,
+            'whatsapp_accounts': whatsapp_accounts,
+            'available_avatars': available_avatars
+        }
+        
+        # Demographic sections: (column, analysis key, heading, rule width, options)
+        sections = [
+            ('gender', 'gender', "👥 GENDER ANALYSIS ({known:,} profiles)", 30, {}),
+            ('age', 'age', "🎂 AGE ANALYSIS ({known:,} profiles)", 25,
+             {'top_n': 10, 'label': str, 'sort_key': self._age_sort_key}),
+            ('hair_color', 'hair_color', "💇 HAIR COLOR ANALYSIS ({known:,} profiles)", 35, {'top_n': 8}),
+            ('skin_color', 'ethnicity', "🌍 ETHNICITY ANALYSIS ({known:,} profiles)", 35, {}),
+            ('category', 'categories', "📷 AVATAR CATEGORY ANALYSIS", 35,
+             {'denominator': available_avatars, 'label': lambda v: str(v).replace('_', ' ').title()}),
+        ]
+        
+        # Hold the report lock so batch runs print one whole report at a time
+        with self._report_lock:
+            print("\n🤖 AI AVATAR ANALYSIS SUMMARY")
+            print("=" * 50)
+            print(f"📁 Results File: {results_file}")
+            print(f"📊 Total Records: {total_records:,}")
+            print(f"✅ WhatsApp Accounts: {whatsapp_accounts:,} ({whatsapp_accounts/total_records*100:.1f}%)")
+            print(f"🖼️ Available Avatars: {available_avatars:,} ({available_avatars/total_records*100:.1f}%)")
             
-            print(f"\n🌍 ETHNICITY ANALYSIS ({ethnicity_known:,} profiles)")
-            print("-" * 35)
-            for ethnicity, count in ethnicity_data.items():
-                if ethnicity != 'unknown':
-                    percentage = count/ethnicity_known*100 if ethnicity_known > 0 else 0
-                    print(f"   {ethnicity.capitalize()}: {count:,} ({percentage:.1f}%)")
+            for col, key, heading, width, options in sections:
+                if col in counts:
+                    analysis[key], _ = self._summarize(counts[col], heading, width, **options)
             
-            analysis['ethnicity'] = ethnicity_data
+            print("\n" + "=" * 50)
+            print("💡 Use this data responsibly and in compliance with privacy laws!")
+        
+        return analysis
+    
+    def _summarize(self, counts: Counter, heading: str, width: int,
+                   top_n: Optional[int] = None, denominator: Optional[int] = None,
+                   label: Callable[[Any], str] = lambda v: str(v).capitalize(),
+                   sort_key: Optional[Callable[[Any], float]] = None) -> Tuple[Dict, int]:
+        """Print the top values of a column with percentages
+        
+        Percentages are relative to the known (non-'unknown') values unless a
+        ``denominator`` is given, in which case 'unknown' is listed as well.
+        Blank cells (counted under ``None``) are not listed but, as with the
+        original ``!= 'unknown'`` filter, are part of the known count.
+        Returns the full value counts and the known count.
+        """
+        ranked = [item for item in counts.most_common() if item[0] is not None]
+        known = sum(count for value, count in counts.items() if value != 'unknown')
+        
+        shown = ranked if denominator is not None else [item for item in ranked if item[0] != 'unknown']
+        if sort_key is not None:
+            shown.sort(key=lambda item: sort_key(item[0]))
+        total = max(known if denominator is None else denominator, 1)
+        
+        print("\n" + heading.format(known=known))
+        print("-" * width)
+        for value, count in shown[:top_n]:
+            print(f"   {label(value)}: {count:,} ({count/total*100:.1f}%)")
+        
+        return dict(ranked), known
+    
+    @staticmethod
+    def _age_sort_key(age: Any) -> float:
+        """Sort key for age ranges like "25-30", unparseable ages go last"""
+        try:
+            return float(str(age).split('-')[0])
+        except ValueError:
+            return 999
+    
+    def _count_results(self, results_file: str, use_cache: bool = False) -> Tuple[int, Dict[str, Counter]]:
+        """Count the values of the analysed result columns in one streaming pass
         
-        # Avatar category analysis
-        if 'category' in df.columns:
-            category_data = df['category'].value_counts().to_dict()
+        With ``use_cache`` the counts are kept in a ``<results_file>.counts.json``
+        sidecar so that re-running the analysis on an unchanged file skips
+        parsing it again.
+        """
+        if not use_cache:
+            return self._parse_results(results_file)
+        
+        cache_file = results_file + '.counts.json'
+        if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(results_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                return cached['total'], {name: Counter(dict(pairs)) for name, pairs in cached['counts'].items()}
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # Unreadable cache, parse the results file again
+        
+        total, counters = self._parse_results(results_file)
+        
+        # Caching is best-effort: serialise first, then swap the file in atomically
+        tmp_path = None
+        try:
+            # Store (value, count) pairs so non-string values such as ages keep their type
+            payload = json.dumps({'total': total,
+                                  'counts': {name: counter.most_common() for name, counter in counters.items()}})
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_file)), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, cache_file)
+        except (OSError, TypeError, ValueError):
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        return total, counters
+    
+    def _parse_results(self, results_file: str) -> Tuple[int, Dict[str, Counter]]:
+        """Stream the results file (.xlsx or .csv) into per-column Counters"""
+        if results_file.endswith('.csv'):
+            # utf-8-sig strips the BOM Excel puts in front of the first header
+            with open(results_file, newline='', encoding='utf-8-sig') as f:
+                total, counters = self._count_rows(csv.reader(f))
+        else:
+            # Imported lazily: only analysis runs need openpyxl
+            from openpyxl import load_workbook
             
-            print(f"\n📷 AVATAR CATEGORY ANALYSIS")
-            print("-" * 35)
-            for category, count in category_data.items():
-                percentage = count/available_avatars*100 if available_avatars > 0 else 0
-                print(f"   {category.replace('_', ' ').title()}: {count:,} ({percentage:.1f}%)")
+            # Stream rows instead of building the full styled workbook
+            workbook = load_workbook(results_file, read_only=True, data_only=True)
+            try:
+                total, counters = self._count_rows(workbook.worksheets[0].iter_rows(values_only=True),
+                                                   trim_trailing_blank=True)
+            finally:
+                workbook.close()
+        
+        return total, counters
+    
+    def _count_rows(self, rows: Iterable[Sequence],
+                    trim_trailing_blank: bool = False) -> Tuple[int, Dict[str, Counter]]:
+        """Accumulate per-column Counters from a header row followed by data rows
+        
+        Blank cells are counted under ``None`` and blank rows count as records,
+        as they did with pandas. ``trim_trailing_blank`` drops blank rows at the
+        end of the sheet, mirroring ``pd.read_excel``.
+        """
+        rows = iter(rows)
+        header = next(rows, ())
+        indices = {name: i for i, name in enumerate(header) if name in self.RESULT_COLUMNS}
+        counters = {name: Counter() for name in indices}
+        total = 0
+        pending_blank = 0
+        
+        for row in rows:
+            if not row:
+                continue  # Empty CSV line, skipped by pd.read_csv as well
+            if all(value is None or value == '' for value in row):
+                pending_blank += 1
+                continue
+            if pending_blank:
+                total += pending_blank
+                for counter in counters.values():
+                    counter[None] += pending_blank
+                pending_blank = 0
             
-            analysis['categories'] = category_data
+            total += 1
+            for name, i in indices.items():
+                value = row[i] if i < len(row) else None
+                counters[name][None if value == '' else value] += 1
         
-        print("\n" + "=" * 50)
-        print("💡 Use this data responsibly and in compliance with privacy laws!")
+        if pending_blank and not trim_trailing_blank:
+            total += pending_blank
+            for counter in counters.values():
+                counter[None] += pending_blank
         
-        return analysis
+        return total, counters
     
     def _parse_age(self, age_str: str) -> float:
-        """Parse age string for sorting"""
+        """Parse age string for sorting (deprecated, no longer used internally)"""
+        warnings.warn('_parse_age is deprecated', DeprecationWarning, stacklevel=2)
         try:
             if '-' in age_str:
                 # Handle age ranges like "25-30"
@@ -222,8 +572,8 @@ class WhatsAppAvatarChecker:
     def export_demographics_summary(self, analysis: Dict, output_file: str = 'demographics_summary.json'):
         """Export demographic analysis to JSON"""
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(analysis, f, indent=2, ensure_ascii=False)
+            with open(output_file, 'wb') as f:
+                f.write(_dumps(analysis))
             print(f"📄 Demographics summary exported to: {output_file}")
             return output_file
         except Exception as e: